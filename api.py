@@ -0,0 +1,128 @@
+"""
+Headless HTTP API for programmatic lookups, without the Gradio UI:
+
+    python api.py
+
+serves /api and /metrics only. app.py mounts the same routes next to the UI.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import quote
+
+import uvicorn
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+import metrics
+from core import (
+    CACHE_LOOKUPS, REQUEST_LOG, STAGE_SECONDS, cache_variant, clean_word, finish_request, generate_entry,
+    get_audio_file, history, sync_cache,
+)
+from settings import DEFAULT_BASE_URL, settings
+from upstream import Priority, with_priority
+
+# The API uses the saved API key and prompts, so its entries are shared with the UI when the
+# UI uses the same base URL.
+API_BASE_URL = os.environ.get("API_BASE_URL", DEFAULT_BASE_URL)
+# Maximum number of words a batch request generates at once, and per request.
+API_BATCH_CONCURRENCY = int(os.environ.get("API_BATCH_CONCURRENCY", "8"))
+API_BATCH_MAX_WORDS = int(os.environ.get("API_BATCH_MAX_WORDS", "1000"))
+
+api = APIRouter(prefix="/api")
+
+class BatchLookup(BaseModel):
+    words: list[str]
+
+def entry_payload(entry, cached):
+    """The structured form of a history entry returned by the API."""
+    return {
+        "word": entry.word,
+        "cached": cached,
+        "sentence": entry.sentence,
+        "phonetics": entry.phonetics,
+        "translations": [{"partOfSpeech": pos, "definition": definition} for pos, definition in entry.translations],
+        "audio_url": f"/api/audio/{quote(entry.word)}",
+    }
+
+async def api_lookup(word):
+    """Looks a word up in the cache, generating it on a miss. Returns the entry payload or {"word", "error"}."""
+    started = time.perf_counter()
+    log = metrics.RequestLog("api", word=word) if REQUEST_LOG else None
+    with metrics.timed_stage(STAGE_SECONDS, "cache_lookup", log):
+        sync_cache()
+        index = history.lookup(word, cache_variant(settings.prompt_template, settings.system_prompt, API_BASE_URL))
+    cache_result = "hit" if index != -1 else "miss"
+    CACHE_LOOKUPS.inc(result=cache_result)
+
+    error_message = None
+    if index == -1:
+        index, error_message = await metrics.with_request_log(
+            log, generate_entry(word, None, API_BASE_URL, settings.prompt_template, settings.system_prompt)
+        )
+    finish_request("api", cache_result, started, log, error=error_message)
+    if error_message:
+        return {"word": word, "error": error_message}
+    return entry_payload(history[index], cached=cache_result == "hit")
+
+@api.get("/words/{word}")
+async def api_word(word: str):
+    """Returns the sentence, phonetics and translations for one word."""
+    word = clean_word(word)
+    if not word:
+        return JSONResponse({"error": "Empty word."}, status_code=400)
+    result = await api_lookup(word)
+    return JSONResponse(result, status_code=502 if "error" in result else 200)
+
+@api.post("/words")
+async def api_words(batch: BatchLookup):
+    """Looks up many words, streaming one JSON line per word in the order they finish."""
+    words = list(dict.fromkeys(w for w in map(clean_word, batch.words) if w))
+    if len(words) > API_BATCH_MAX_WORDS:
+        return JSONResponse({"error": f"At most {API_BATCH_MAX_WORDS} words per request."}, status_code=413)
+
+    semaphore = asyncio.Semaphore(API_BATCH_CONCURRENCY)
+
+    async def lookup(word):
+        async with semaphore:
+            return await with_priority(Priority.BULK, api_lookup(word))
+
+    async def lines():
+        tasks = [asyncio.ensure_future(lookup(word)) for word in words]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        finally:
+            # The client went away; generations already started still finish and are cached.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@api.get("/audio/{word}")
+async def api_audio(word: str):
+    """Returns the pronunciation of a word."""
+    audio_path = await get_audio_file(word)
+    if not audio_path:
+        return JSONResponse({"error": "No audio available."}, status_code=404)
+    return FileResponse(audio_path, media_type="audio/mpeg")
+
+def create_api_app():
+    """Serves the JSON API under /api and Prometheus metrics at /metrics."""
+    server_app = FastAPI()
+    server_app.include_router(api)
+
+    @server_app.get("/metrics")
+    def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+    return server_app
+
+if __name__ == "__main__":
+    uvicorn.run(
+        create_api_app(),
+        host=os.environ.get("API_SERVER_NAME", "127.0.0.1"),
+        port=int(os.environ.get("API_SERVER_PORT", "8000")),
+    )
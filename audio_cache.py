@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+
+from file_lock import locked
+
+
+class AudioCache:
+    """
+    Bounded on-disk cache of pronunciation audio.
+
+    Files are named by a hash of (pronunciation, text), so different texts never share a file.
+    The files carry what eviction needs: their size, and as the last access their modification
+    time, which lookup() bumps. Storing a file therefore costs the same however full the cache
+    is: each process keeps a running total of the directory's size and only scans it when the
+    total passes `max_bytes` (or every RESCAN_INTERVAL seconds, to count what other processes
+    wrote), then evicts the least recently used files down to EVICT_TO of the budget.
+    Texts the upstream could not voice are remembered by an empty marker file for
+    `negative_ttl` seconds so they are not requested again on every lookup.
+
+    Several processes may share the directory: scans count every file, evictions hold a lock
+    next to the files, and temporary files are private to each process. store() and
+    remember_missing() write to disk and may wait for that lock; run them in a thread from
+    async code.
+    """
+
+    LOCK_FILE = "evict.lock"
+    EVICT_TO = 0.9
+    RESCAN_INTERVAL = 60.0
+
+    def __init__(self, directory, max_bytes, negative_ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.lock_path = os.path.join(directory, self.LOCK_FILE)
+        self.total_bytes = 0
+        self._scanned_at = 0.0
+        self._evicting = False
+        self._lock = threading.Lock()
+        # Older versions kept an index of the files; their own times replace it.
+        self._remove(os.path.join(directory, "index.json"))
+        self._scan()
+
+    @staticmethod
+    def key(text, pronunciation):
+        return hashlib.sha256(f"{pronunciation}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _missing_path(self, key):
+        return os.path.join(self.directory, f"{key}.missing")
+
+    def lookup(self, text, pronunciation):
+        """Returns the cached file for a text, or None."""
+        path = self.path_for(self.key(text, pronunciation))
+        try:
+            # Marks the file as recently used.
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def is_known_missing(self, text, pronunciation):
+        """Whether the upstream recently failed to voice this text."""
+        try:
+            recorded = os.stat(self._missing_path(self.key(text, pronunciation))).st_mtime
+        except OSError:
+            return False
+        return recorded + self.negative_ttl > time.time()
+
+    def store(self, text, pronunciation, content):
+        """Writes downloaded audio to the cache, evicting old files if over budget. Returns its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.key(text, pronunciation)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self._remove(self._missing_path(key))
+
+        with self._lock:
+            self.total_bytes += len(content)
+            due = (self.total_bytes > self.max_bytes
+                   or time.monotonic() - self._scanned_at > self.RESCAN_INTERVAL)
+        if due:
+            self._evict(keep=path)
+        return path
+
+    def remember_missing(self, text, pronunciation):
+        """Records that the upstream could not voice a text."""
+        os.makedirs(self.directory, exist_ok=True)
+        # The marker's modification time is when it was recorded.
+        with open(self._missing_path(self.key(text, pronunciation)), "wb"):
+            pass
+
+    def _evict(self, keep):
+        with self._lock:
+            if self._evicting:
+                return
+            self._evicting = True
+        try:
+            with locked(self.lock_path):
+                files = self._scan()
+                if self.total_bytes <= self.max_bytes:
+                    return
+                target = self.max_bytes * self.EVICT_TO
+                removed = 0
+                for _, size, path in files:
+                    if self.total_bytes - removed <= target:
+                        break
+                    # Always keep the file that was just stored, even if it alone exceeds the budget.
+                    if path != keep and self._remove(path):
+                        removed += size
+                with self._lock:
+                    self.total_bytes -= removed
+        finally:
+            self._evicting = False
+
+    def _scan(self):
+        # The audio files, least recently used first, as (last access, size, path). Also
+        # recounts total_bytes and drops expired missing markers.
+        files = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".mp3"):
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith(".missing") and stat.st_mtime + self.negative_ttl <= now:
+                self._remove(entry.path)
+        files.sort()
+        with self._lock:
+            self.total_bytes = sum(size for _, size, _ in files)
+            self._scanned_at = time.monotonic()
+        return files
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,71 @@
+"""
+Cache hit rate with and without word normalization.
+
+Replays the app's main interaction against an existing cache: clicking every word of every
+cached sentence. Reports how many clicks are hits with exact word matching and with the
+case-folding / lemma alias lookup, and checks that words known to be mistaken for an
+unrelated cached word (FALSE_MATCHES) miss.
+
+    python benchmarks/alias_hit_rate.py [generation_cache.json]
+"""
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from history_store import Entry, HistoryStore
+from normalize import word_forms
+
+
+# (lookup, cached word) pairs the lemma rules once matched wrongly.
+FALSE_MATCHES = [
+    ("The", "thing"), ("see", "seed"), ("she", "shed"), ("bee", "being"),
+    ("hates", "hat"), ("cares", "car"), ("planes", "plan"), ("bites", "bit"), ("stares", "star"),
+    ("apply", "app"), ("united", "unit"), ("wicked", "wick"),
+]
+
+
+def clean_word(word):
+    # Same as app.clean_word, without importing the UI.
+    return word.strip(".,!?;:'\"- ")
+
+
+def load_entries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+    return [Entry.from_record(record) for record in records]
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "generation_cache.json")
+    entries = load_entries(path)
+    exact = HistoryStore(entries)
+    aliased = HistoryStore(entries, word_forms=word_forms)
+
+    clicks = [clean_word(word) for entry in entries for word in entry.words]
+    clicks = [word for word in clicks if word]
+    exact_hits = sum(exact.find(word, None) != -1 for word in clicks)
+    aliased_hits = sum(aliased.lookup(word, None) != -1 for word in clicks)
+    extra = sorted({word for word in clicks if exact.find(word, None) == -1 and aliased.lookup(word, None) != -1})
+
+    print(f"{len(entries)} cached entries, {len(clicks)} word clicks replayed")
+    print(f"exact match:      {exact_hits:>6} hits ({exact_hits / max(len(clicks), 1):.1%})")
+    print(f"normalized/alias: {aliased_hits:>6} hits ({aliased_hits / max(len(clicks), 1):.1%})")
+    if extra:
+        print("newly hitting words:", ", ".join(extra))
+
+    cached = HistoryStore([Entry(word, None, "", "", ()) for _, word in FALSE_MATCHES], word_forms=word_forms)
+    wrong = [f"{query} -> {cached[index].word}" for query, _ in FALSE_MATCHES
+             if (index := cached.lookup(query, None)) != -1]
+    print("false matches:", ", ".join(wrong) if wrong else "none")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
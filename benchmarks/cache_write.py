@@ -0,0 +1,52 @@
+"""
+Micro-benchmark: cost of persisting one new word to the generation cache.
+
+Compares rewriting the whole history as one JSON document (the old save_cache)
+with appending a single line to the CacheJournal.
+
+    python benchmarks/cache_write.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import CacheJournal, Entry
+from history_lookup import make_entries
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 20
+
+
+def rewrite_json(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=4)
+
+
+def main():
+    print(f"{'entries':>10} {'full rewrite (ms)':>18} {'journal append (ms)':>20}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            entries = make_entries(n)
+            json_path = os.path.join(tmp, f"cache_{n}.json")
+            journal = CacheJournal(os.path.join(tmp, f"cache_{n}.jsonl"))
+
+            start = time.perf_counter()
+            for i in range(REPEAT):
+                entries.append(Entry(f"new{i}", None, "New.", "", ()))
+                rewrite_json(json_path, [entry.to_record() for entry in entries])
+            rewrite = (time.perf_counter() - start) / REPEAT
+
+            start = time.perf_counter()
+            for entry in entries[-REPEAT:]:
+                journal.append(entry.to_record())
+            append = (time.perf_counter() - start) / REPEAT
+
+            print(f"{n:>10} {rewrite * 1e3:>18.2f} {append * 1e3:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
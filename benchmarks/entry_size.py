@@ -0,0 +1,65 @@
+"""
+Memory and disk size of the generation history: the old dict entries, which stored the
+button words and the rendered details markdown, against the structured Entry.
+
+Entries are modelled on the shipped generation_cache.json and loaded the way the app
+loads them (one JSON record per line), so both sides hold freshly parsed strings.
+
+    python benchmarks/entry_size.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from history_store import Entry
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def legacy_records(n):
+    with open(os.path.join(ROOT, "generation_cache.json"), "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    records = []
+    for i in range(n):
+        template = templates[i % len(templates)]
+        record = dict(template, word=f"{template['word']}{i}", variant="80900b0722f6")
+        record["sentence"] = f"{template['sentence']} ({i})"
+        record["words"] = record["sentence"].split()
+        records.append(record)
+    return records
+
+
+def measure(lines, load):
+    gc.collect()
+    tracemalloc.start()
+    entries = [load(line) for line in lines]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size
+
+
+def main():
+    print(f"{'entries':>10} {'old disk (KB)':>14} {'new disk (KB)':>14} {'old memory (KB)':>16} {'new memory (KB)':>16}")
+    for n in SIZES:
+        records = legacy_records(n)
+        old_lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        new_lines = [json.dumps(Entry.from_record(record).to_record(), ensure_ascii=False) for record in records]
+
+        old_disk = sum(len(line.encode("utf-8")) + 1 for line in old_lines)
+        new_disk = sum(len(line.encode("utf-8")) + 1 for line in new_lines)
+        old_memory = measure(old_lines, json.loads)
+        new_memory = measure(new_lines, lambda line: Entry.from_record(json.loads(line)))
+
+        print(f"{n:>10} {old_disk / 1024:>14.0f} {new_disk / 1024:>14.0f} "
+              f"{old_memory / 1024:>16.0f} {new_memory / 1024:>16.0f}")
+    print(f"disk: {1 - new_disk / old_disk:.0%} smaller, memory: {1 - new_memory / old_memory:.0%} smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local stand-ins for the DeepSeek chat API and the Youdao pronunciation endpoint.
+
+POST /chat/completions answers like an OpenAI-compatible API (plain or streamed) with a
+generated sentence for the requested word(s); GET /dictvoice returns a fake mp3. Latency,
+streaming pace, payload size and error rate are configurable, so the app can be load-tested
+offline. Used by benchmarks/load_test.py, or on its own:
+
+    python benchmarks/fake_upstreams.py --port 8900 --llm-latency 0.8
+    DEEPSEEK_API_KEY=x AUDIO_BASE_URL=http://127.0.0.1:8900/dictvoice python app.py
+    (then set the Base URL in the UI to http://127.0.0.1:8900)
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+VOCAB = """
+time year people way day man thing woman life child world school state family student group
+country problem hand part place case week company system program question work government
+number night point home water room mother area money story fact month lot right study book
+eye job word business issue side kind head house service friend father power hour game line
+end member law car city community name president team minute idea kid body information back
+parent face others level office door health person art war history party result change morning
+reason research girl guy moment air teacher force education foot boy age policy process music
+market sense nation plan college interest death experience effect class control care field
+""".split()
+
+SINGLE_WORD = re.compile(r'For the word "(.*?)"')
+BATCH_WORDS = re.compile(r"for each of these words: (\[.*?\])")
+
+
+def make_generation(word, rng, sentence_words):
+    others = rng.sample(VOCAB, sentence_words - 2)
+    sentence = " ".join(["The", word, *others]).capitalize() + "."
+    return {
+        "sentence": sentence,
+        "phonetics": f"/{word}/",
+        "translations": [
+            {"partOfSpeech": "n.", "definition": f"{word} 的释义"},
+            {"partOfSpeech": "v.", "definition": f"{word} 的动词释义"},
+        ],
+    }
+
+
+def completion_content(prompt, rng, sentence_words):
+    batch = BATCH_WORDS.search(prompt)
+    if batch:
+        words = json.loads(batch.group(1))
+        entries = [{"word": w, **make_generation(w, rng, sentence_words)} for w in words]
+        return json.dumps({"entries": entries}, ensure_ascii=False)
+    match = SINGLE_WORD.search(prompt)
+    word = match.group(1) if match else "word"
+    return json.dumps(make_generation(word, rng, sentence_words), ensure_ascii=False)
+
+
+def create_app(args):
+    app = FastAPI()
+    rng = random.Random(args.seed)
+    stats = {"chat": 0, "audio": 0, "errors": 0}
+
+    async def delay(base):
+        await asyncio.sleep(max(0.0, base + rng.uniform(-args.jitter, args.jitter) * base))
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        stats["chat"] += 1
+        body = await request.json()
+        await delay(args.llm_latency)
+        if rng.random() < args.llm_error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Service busy", "type": "server_error"}}, status_code=503)
+
+        prompt = body["messages"][-1]["content"]
+        content = completion_content(prompt, rng, args.sentence_words)
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            size = args.chunk_chars
+            for start in range(0, len(content), size):
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(args.chunk_interval)
+            done = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/dictvoice")
+    async def dictvoice(audio: str = "", type: int = 2):
+        stats["audio"] += 1
+        await delay(args.audio_latency)
+        return Response(content=b"ID3" + bytes(args.audio_bytes), media_type="audio/mpeg")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def add_arguments(parser):
+    """Adds the fake upstream options to an argument parser."""
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds before the first token (default 0.5).")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="Seconds between streamed chunks (default 0.02).")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per streamed chunk (default 16).")
+    parser.add_argument("--audio-latency", type=float, default=0.1, help="Seconds per audio download (default 0.1).")
+    parser.add_argument("--audio-bytes", type=int, default=8000, help="Size of each fake mp3 (default 8000).")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative +/- latency jitter (default 0.2).")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of completions failing with 503.")
+    parser.add_argument("--sentence-words", type=int, default=10, help="Words per generated sentence (default 10).")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: word lookup in the generation history.
+
+Compares the old linear scan over the history list with HistoryStore.find
+for a word at the end of the history (the worst case for the scan).
+
+    python benchmarks/history_lookup.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import Entry, HistoryStore
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 200
+
+
+def make_entries(n):
+    return [Entry(f"word{i}", None, f"This is sentence {i}.", "/wɜːd/", (("n.", "单词"),)) for i in range(n)]
+
+
+def linear_find(history, word):
+    for i, entry in enumerate(history):
+        if entry.word == word:
+            return i
+    return -1
+
+
+def main():
+    print(f"{'entries':>10} {'linear scan (us)':>18} {'HistoryStore (us)':>18}")
+    for n in SIZES:
+        entries = make_entries(n)
+        store = HistoryStore(entries)
+        target = f"word{n - 1}"
+        assert linear_find(entries, target) == store.find(target) == n - 1
+
+        linear = timeit.timeit(lambda: linear_find(entries, target), number=REPEAT) / REPEAT
+        indexed = timeit.timeit(lambda: store.find(target), number=REPEAT) / REPEAT
+        print(f"{n:>10} {linear * 1e6:>18.2f} {indexed * 1e6:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
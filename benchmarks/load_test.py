@@ -0,0 +1,207 @@
+"""
+Load test: N concurrent simulated sessions against local stand-ins for DeepSeek and Youdao.
+
+Starts benchmarks/fake_upstreams.py in a subprocess, imports the app in a scratch directory
+(so the real cache and audio files are untouched) with the LLM base URL and the audio URL
+pointed at it, then drives generate_and_update_history, navigate_history and
+regenerate_and_update_history the way users do: look up a word, then click words of the
+shown sentence, page back and forth and occasionally regenerate. Reports throughput,
+p50/p99 latency per handler and the process memory.
+
+    python benchmarks/load_test.py --sessions 50 --steps 20
+    python benchmarks/load_test.py --sessions 200 --llm-latency 1.5 --no-stream --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_upstreams import VOCAB, add_arguments
+
+FAKE_OPTIONS = [
+    "llm_latency", "chunk_interval", "chunk_chars", "audio_latency", "audio_bytes",
+    "jitter", "llm_error_rate", "sentence_words", "seed",
+]
+
+
+def rss_mb():
+    """Current resident set size in MB, from /proc where available."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def start_fake_upstreams(args):
+    command = [sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(args.port)]
+    for name in FAKE_OPTIONS:
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    process = subprocess.Popen(command)
+    url = f"http://127.0.0.1:{args.port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/stats", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("fake upstreams did not start")
+
+
+def import_app(args, fake_url):
+    """Imports app.py from a scratch working directory, configured for the fake upstreams."""
+    os.chdir(tempfile.mkdtemp(prefix="sentence-generator-load-"))
+    os.environ["AUDIO_BASE_URL"] = f"{fake_url}/dictvoice"
+    os.environ["STREAM_GENERATION"] = "1" if args.stream else "0"
+    os.environ["PREFETCH_SESSION_BUDGET"] = str(args.prefetch_budget)
+    os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+    import app
+    return app
+
+
+async def drive(latencies, handler, result):
+    """Runs one UI event to completion, recording its latency and time to the first update."""
+    start = time.perf_counter()
+    if hasattr(result, "__aiter__"):
+        outputs = first_update = None
+        async for outputs in result:
+            if first_update is None:
+                first_update = time.perf_counter() - start
+        latencies["first_update"].setdefault(handler, []).append(first_update)
+    else:
+        outputs = await result
+    latencies["total"].setdefault(handler, []).append(time.perf_counter() - start)
+    # Failed generations show their error message in place of the sentence.
+    if isinstance(outputs[1], str) and outputs[1].startswith(("Error", "An error")):
+        latencies["errors"][handler] = latencies["errors"].get(handler, 0) + 1
+    return outputs
+
+
+async def run_session(app, session, args, fake_url, latencies):
+    rng = random.Random(args.seed * 1_000_003 + session)
+    request = SimpleNamespace(session_hash=f"load-test-{session}")
+    settings = ("load-test-key", fake_url, app.settings.prompt_template, app.settings.system_prompt)
+    word, index = rng.choice(VOCAB), -1
+
+    for step in range(args.steps + 1):
+        if args.think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+        action = rng.random()
+        if step == 0 or index < 0 or action < 0.7:
+            if index >= 0:
+                clickable = [app.clean_word(w) for w in app.history[index].words]
+                word = rng.choice([w for w in clickable if w] or VOCAB)
+            outputs = await drive(latencies, "generate", app.generate_and_update_history(word, *settings, index, request))
+        elif action < 0.9:
+            outputs = await drive(latencies, "navigate", app.navigate_history(index, rng.choice((-1, 1)), request))
+        else:
+            outputs = await drive(latencies, "regenerate", app.regenerate_and_update_history(word, *settings, index, request))
+        if isinstance(outputs[4], int):
+            index = outputs[4]
+            if index >= 0:
+                word = app.history[index].word
+
+    app.end_session(request)
+
+
+async def run(app, args, fake_url):
+    latencies = {"total": {}, "first_update": {}, "errors": {}}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(app, session, args, fake_url, latencies) for session in range(args.sessions)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated sessions (default 20).")
+    parser.add_argument("--steps", type=int, default=10, help="UI events per session after the first lookup (default 10).")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a session's events in seconds.")
+    parser.add_argument("--prefetch-budget", type=int, default=0, help="PREFETCH_SESSION_BUDGET for the app (default 0, off).")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="Run with STREAM_GENERATION=0.")
+    parser.add_argument("--port", type=int, default=8900, help="Port for the fake upstreams (default 8900).")
+    parser.add_argument("--json", action="store_true", help="Print the results as one JSON object.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    process, fake_url = start_fake_upstreams(args)
+    try:
+        app = import_app(args, fake_url)
+        rss_before = rss_mb()
+        latencies, elapsed = asyncio.run(run(app, args, fake_url))
+        upstream = httpx.get(f"{fake_url}/stats").json()
+    finally:
+        process.terminate()
+        process.wait()
+
+    events = sum(len(v) for v in latencies["total"].values())
+    handlers = {
+        handler: {
+            "count": len(values),
+            "errors": latencies["errors"].get(handler, 0),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            # Only the streaming handlers send intermediate updates.
+            "first_update_p50_ms": (
+                percentile(latencies["first_update"][handler], 0.50) * 1000 if handler in latencies["first_update"] else None
+            ),
+        }
+        for handler, values in sorted(latencies["total"].items())
+    }
+    result = {
+        "sessions": args.sessions,
+        "events": events,
+        "seconds": elapsed,
+        "events_per_second": events / elapsed,
+        "handlers": handlers,
+        "history_entries": len(app.history),
+        "upstream_requests": upstream,
+        "rss_mb_before": rss_before,
+        "rss_mb_after": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{args.sessions} sessions, {events} events in {elapsed:.2f}s: {result['events_per_second']:.1f} events/s")
+    print(f"{'handler':>12} {'count':>7} {'errors':>7} {'p50 (ms)':>10} {'p99 (ms)':>10} {'first update p50 (ms)':>22}")
+    for handler, stats in handlers.items():
+        first_update = "-" if stats["first_update_p50_ms"] is None else f"{stats['first_update_p50_ms']:.1f}"
+        print(f"{handler:>12} {stats['count']:>7} {stats['errors']:>7} {stats['p50_ms']:>10.1f} {stats['p99_ms']:>10.1f} {first_update:>22}")
+    print(f"history entries: {result['history_entries']}, upstream requests: {upstream}")
+    print(f"memory: {rss_before:.1f} MB after import, {result['rss_mb_after']:.1f} MB after run, peak {result['peak_rss_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Several worker processes sharing one cache journal.
+
+Each worker replays what the app does per request: revalidate against the journal
+(CacheJournal.refresh), look a word up and, every few requests, store a new or regenerated
+entry, compacting the journal when the app would. Afterwards every worker must see every
+entry and the journal must hold all of them. Reports the aggregate requests per second for
+1, 2 and 4 workers.
+
+    python benchmarks/shared_cache.py [--words 500] [--lookups 20]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import CacheJournal, Entry, HistoryStore
+
+WORKERS = [1, 2, 4]
+
+
+def sync(journal, history):
+    for record in journal.refresh():
+        history.upsert(Entry.from_record(record))
+
+
+def worker(worker_id, path, args, barrier, results):
+    journal = CacheJournal(path, compact_min_records=200, compact_ratio=1.5)
+    history = HistoryStore()
+    for record in journal.load():
+        history.upsert(Entry.from_record(record))
+    barrier.wait()
+
+    start = time.perf_counter()
+    requests = 0
+    # Every word is written twice (a generation and a regeneration), so compaction has work to do.
+    for i in range(2 * args.words):
+        for _ in range(args.lookups):
+            sync(journal, history)
+            history.lookup(f"w{worker_id}-{i % args.words}", "v")
+            requests += 1
+        entry = Entry(f"w{worker_id}-{i % args.words}", "v", f"Sentence {i} of worker {worker_id}.", "/w/", (("n.", "词"),))
+        history.upsert(entry)
+        journal.append(entry.to_record())
+        if journal.needs_compaction(len(history)):
+            journal.compact()
+    elapsed = time.perf_counter() - start
+
+    barrier.wait()
+    sync(journal, history)
+    results.put((worker_id, requests, elapsed, len(history)))
+
+
+def run(workers, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "generation_cache.jsonl")
+        barrier = multiprocessing.Barrier(workers)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(i, path, args, barrier, results)) for i in range(workers)]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        stored = len({(record["word"], record["variant"]) for record in CacheJournal(path).load()})
+
+    expected = workers * args.words
+    requests = sum(report[1] for report in reports)
+    elapsed = max(report[2] for report in reports)
+    seen = min(report[3] for report in reports)
+    status = "ok" if stored == expected and seen == expected else "LOST ENTRIES"
+    print(f"{workers:>8} {requests / elapsed:>14.0f} {expected:>9} {stored:>8} {seen:>12}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=500, help="Distinct words each worker stores (default 500).")
+    parser.add_argument("--lookups", type=int, default=20, help="Lookups per stored entry (default 20).")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'requests/s':>14} {'expected':>9} {'stored':>8} {'min seen':>12}")
+    for workers in WORKERS:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold-start time of the entry points: importing the generation core, building the headless
+API app (api.py) and building the full server with the Gradio UI (app.py).
+
+Each measurement runs in a fresh interpreter in an empty scratch directory, so every import
+is cold for Python (the OS file cache stays warm) and no cache files are loaded. Also lists
+which heavy packages each entry point pulled in. --tree measures another checkout instead,
+e.g. an older commit from `git worktree add`; trees from before api.py existed build the
+headless API through app.py, the only entry point they had.
+
+    python benchmarks/startup_time.py [--runs 5] [--tree PATH]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["gradio", "openai", "httpx", "fastapi"]
+
+# Entry point -> (module it needs, code to time), in order of preference.
+SCENARIOS = {
+    "core": [("core.py", "import core")],
+    "headless API": [
+        ("api.py", "import api; api.create_api_app()"),
+        ("app.py", "import app; app.create_server_app()"),
+    ],
+    "UI server": [("app.py", "import app; app.create_server_app()")],
+}
+
+PROBE = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(tree, code, runs):
+    env = dict(os.environ, PYTHONPATH=tree, GRADIO_ANALYTICS_ENABLED="False")
+    env.pop("DEEPSEEK_API_KEY", None)
+    times = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                cwd=scratch, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            times.append(result["seconds"])
+    return statistics.median(times), result["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter starts per entry point (default 5).")
+    parser.add_argument("--tree", default=ROOT, help="Source tree to measure (default: this checkout).")
+    args = parser.parse_args()
+
+    tree = os.path.abspath(args.tree)
+    # One throwaway run, so the first measurement does not pay for compiling to .pyc.
+    measure(tree, SCENARIOS["UI server"][0][1], 1)
+
+    print(tree)
+    print(f"{'entry point':<14} {'median (ms)':>12}  {'code':<40} heavy imports")
+    for name, candidates in SCENARIOS.items():
+        for module, code in candidates:
+            if os.path.exists(os.path.join(tree, module)):
+                seconds, loaded = measure(tree, code, args.runs)
+                print(f"{name:<14} {seconds * 1000:>12.0f}  {code:<40} {', '.join(loaded) or '-'}")
+                break
+        else:
+            print(f"{name:<14} {'-':>12}  (not in this tree)")
+
+
+if __name__ == "__main__":
+    main()
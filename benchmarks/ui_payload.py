@@ -0,0 +1,92 @@
+"""
+Per-click cost of the UI: pages through the history with the Next Word button the way
+Gradio runs the event (Blocks.process_api, including preparing the outputs for the
+browser) and reports the size of the outputs sent back and the server time per click,
+for growing sentence lengths and history sizes. Also checks that the page the server
+serves carries the word row's CSS. --tree measures another checkout, e.g. an older commit
+from `git worktree add`.
+
+    python benchmarks/ui_payload.py [--clicks 200] [--tree PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HISTORY_SIZES = [1_000, 100_000]
+SENTENCE_WORDS = [10, 20, 40, 80]
+
+
+def fill_history(app, entry_class, size, words, audio_path):
+    app.history.reload([
+        entry_class(f"word{i}", None, " ".join(f"w{i}x{j}" for j in range(words)) + ".", "/wɜːd/",
+                    (("n.", "单词"),), audio_path)
+        for i in range(size)
+    ])
+
+
+async def click_next(app, state_class, clicks):
+    demo = app.demo
+    navigate = next(fn for fn in demo.fns.values() if fn.name == "navigate_history" and fn.inputs[1].value == 1)
+    state = state_class(demo)
+    sizes, times = [], []
+    for index in range(clicks):
+        state[navigate.inputs[0]._id] = index
+        start = time.perf_counter()
+        output = await demo.process_api(navigate, [index, 1], state=state)
+        times.append(time.perf_counter() - start)
+        sizes.append(len(json.dumps(output["data"], ensure_ascii=False, default=str).encode("utf-8")))
+    return statistics.median(sizes), statistics.median(times)
+
+
+def check_page(app):
+    """Whether the page served by the mounted app styles the word row (radio circles hidden)."""
+    from fastapi.testclient import TestClient
+
+    if not hasattr(app, "create_server_app"):
+        return None
+    with TestClient(app.create_server_app()) as client:
+        return '#word_row input[type="radio"]' in (client.get("/config").json().get("css") or "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clicks", type=int, default=200, help="Clicks per configuration (default 200).")
+    parser.add_argument("--tree", default=ROOT, help="Source tree to measure (default: this checkout).")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.tree))
+    os.chdir(tempfile.mkdtemp(prefix="sentence-generator-ui-"))
+    os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+    warnings.simplefilter("ignore")
+    import app
+    from gradio.state_holder import SessionState
+    from history_store import Entry
+
+    audio_path = os.path.abspath("word.mp3")
+    with open(audio_path, "wb") as f:
+        f.write(b"ID3" + bytes(2000))
+
+    print(os.path.abspath(args.tree))
+    print(f"{'history':>8} {'words':>6} {'payload (bytes)':>16} {'server time (ms)':>17}")
+    for size in HISTORY_SIZES:
+        for words in SENTENCE_WORDS:
+            fill_history(app, Entry, size, words, audio_path)
+            payload, seconds = asyncio.run(click_next(app, SessionState, args.clicks))
+            print(f"{size:>8} {words:>6} {payload:>16.0f} {seconds * 1000:>17.2f}")
+
+    styled = check_page(app)
+    print("word row CSS on the served page:", {True: "yes", False: "MISSING", None: "n/a (no server app)"}[styled])
+    if styled is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Typeahead latency over the cached words: WordIndex.search against scanning every cached
+word with an edit distance, for histories of made-up words. Queries are cached words with
+one letter replaced, as a typo would have it, and prefixes of cached words. Also reports
+the index build time, the time to build the deletion index for typo search (which the app
+does in a background thread), the longest an event loop running meanwhile was held up, and
+the memory the index keeps, next to the peak while building it.
+
+    python benchmarks/word_search.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from word_index import WordIndex, fold
+
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 300
+SCAN_QUERIES = 5
+
+ONSETS = "b c d f g h l m n p r s t v w st tr pl ch sh br gr".split()
+NUCLEI = "a e i o u ea ou io ai".split()
+CODAS = ["", "n", "r", "t", "s", "nd", "st", "ng", "ck", "ll", "m", "l"]
+SUFFIXES = ["", "", "", "s", "ed", "ing", "tion", "ly", "er", "ness", "ment", "able"]
+
+
+def make_words(n, rng):
+    words = set()
+    while len(words) < n:
+        syllables = rng.choice((1, 2, 2, 3))
+        words.add("".join(rng.choice(ONSETS) + rng.choice(NUCLEI) + rng.choice(CODAS) for _ in range(syllables))
+                  + rng.choice(SUFFIXES))
+    return list(words)
+
+
+def typo(word, rng):
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, previous[j] + 1, previous[j - 1] + (ca != cb)))
+        previous = row
+    return previous[-1]
+
+
+def scan(words, text, limit=8):
+    """The index-free alternative: every cached word's edit distance to the text."""
+    key = fold(text)
+    matches = sorted((edit_distance(key, fold(word)), word) for word in words)
+    return [word for distance, word in matches[:limit] if distance <= 2]
+
+
+def timed_us(func, queries):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times), statistics.quantiles(times, n=100)[98]
+
+
+async def longest_stall(thread):
+    """Runs an event loop ticking every millisecond until the thread ends; the longest gap in ms."""
+    thread.start()
+    longest = 0.0
+    last = time.perf_counter()
+    while thread.is_alive():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return longest * 1000
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'words':>8} {'build (ms)':>11} {'typo index (ms)':>16} {'loop stall (ms)':>16} {'memory/peak (MB)':>17} "
+          f"{'prefix p50/p99 (us)':>20} {'typo p50/p99 (us)':>18} {'scan p50 (us)':>14} {'typo found':>11}")
+    for n in SIZES:
+        words = make_words(n, rng)
+        sample = rng.sample(words, QUERIES)
+        typos = [typo(word, rng) for word in sample]
+        prefixes = [word[:3] for word in sample]
+
+        start = time.perf_counter()
+        index = WordIndex(words)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        index.build_deletions()
+        typo_index = time.perf_counter() - start
+        stall = asyncio.run(longest_stall(threading.Thread(target=WordIndex(words).build_deletions)))
+
+        tracemalloc.start()
+        kept = WordIndex(words)
+        kept.build_deletions()
+        memory, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+
+        prefix_p50, prefix_p99 = timed_us(index.search, prefixes)
+        typo_p50, typo_p99 = timed_us(index.search, typos)
+        scan_p50, _ = timed_us(lambda text: scan(words, text), typos[:SCAN_QUERIES])
+        found = sum(word in index.search(text) for word, text in zip(sample, typos)) / QUERIES
+
+        print(f"{n:>8} {build * 1000:>11.1f} {typo_index * 1000:>16.1f} {stall:>16.1f} {memory / 1e6:>8.1f}/{peak / 1e6:<8.1f} "
+              f"{prefix_p50:>10.1f}/{prefix_p99:<9.1f} {typo_p50:>9.1f}/{typo_p99:<8.1f} {scan_p50:>14.0f} {found:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,564 @@
+"""
+The generation and cache core shared by the UI (app.py), the headless API (api.py) and
+warmup.py. It does not import Gradio, and the OpenAI SDK and httpx are only imported when
+the first upstream client is created.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from audio_cache import AudioCache
+from history_store import CacheJournal, Entry, HistoryStore
+from json_stream import JsonFieldStream
+from normalize import FUNCTION_WORDS, fold, word_forms
+from prefetch import Prefetcher
+from settings import DEFAULT_BASE_URL, settings
+from single_flight import SingleFlight
+from upstream import CircuitOpenError, Priority, UpstreamScheduler, with_priority
+
+CACHE_FILE = "generation_cache.jsonl"
+# The old single-document cache; migrated into CACHE_FILE on first start.
+LEGACY_CACHE_FILE = "generation_cache.json"
+
+cache_journal = CacheJournal(CACHE_FILE, legacy_path=LEGACY_CACHE_FILE)
+
+# Metrics exposed on /metrics. Set REQUEST_LOG=1 to also print one JSON line per request.
+STAGE_SECONDS = metrics.Histogram("sentence_generator_stage_seconds", "Time spent in each generation stage.", ["stage"])
+REQUEST_SECONDS = metrics.Histogram("sentence_generator_request_seconds", "End-to-end latency of UI events.", ["handler", "cache"])
+CACHE_LOOKUPS = metrics.Counter("sentence_generator_cache_lookups_total", "History cache lookups by result.", ["result"])
+UPSTREAM_ERRORS = metrics.Counter("sentence_generator_upstream_errors_total", "Failed calls to the LLM and audio upstreams.", ["upstream", "kind"])
+UPSTREAM_RETRIES = metrics.Counter("sentence_generator_upstream_retries_total", "Retried calls to the LLM and audio upstreams.", ["upstream"])
+LLM_TOKENS = metrics.Counter("sentence_generator_llm_tokens_total", "Tokens used by completion requests.", ["type"])
+REQUEST_LOG = os.environ.get("REQUEST_LOG", "0") == "1"
+
+def upgrade_records(records):
+    """Converts records from before entries were structured to the compact form, once; None if there are none."""
+    if not any("translation_text" in record for record in records):
+        return None
+    return [Entry.from_record(record, default_variant=LEGACY_VARIANT).to_record() for record in records]
+
+def load_cache():
+    """Loads the generation history from the cache journal."""
+    history = HistoryStore(word_forms=word_forms)
+    for record in cache_journal.load(upgrade=upgrade_records):
+        history.upsert(Entry.from_record(record, default_variant=LEGACY_VARIANT))
+    history.index_words()
+    return history
+
+def sync_cache():
+    """
+    Adds the entries other processes sharing the cache (e.g. other app workers or warmup.py)
+    saved since the last check, and picks up settings they saved. Cheap when nothing changed.
+    """
+    settings.refresh()
+    for record in cache_journal.refresh():
+        history.upsert(Entry.from_record(record, default_variant=LEGACY_VARIANT))
+
+# Journal writes may wait for another process holding the journal lock (e.g. while it
+# compacts), so they run in this thread, one at a time to keep the journal in history order.
+cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-writer")
+
+async def save_cache(entry):
+    """Appends a new or regenerated entry to the cache journal, compacting it when needed."""
+    with metrics.timed_stage(STAGE_SECONDS, "cache_write"):
+        await asyncio.get_running_loop().run_in_executor(cache_writer, write_cache, entry.to_record())
+
+def write_cache(record):
+    cache_journal.append(record)
+    if cache_journal.needs_compaction(len(history)):
+        cache_journal.compact()
+
+
+# Connection pool settings for the LLM API clients.
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "10"))
+
+# Async LLM clients keyed by (api_key, base_url), kept alive so requests reuse connections.
+llm_clients = {}
+
+def get_llm_client(key, base_url):
+    """Returns the shared async client for an API key and base URL, creating it on first use."""
+    client = llm_clients.get((key, base_url))
+    if client is None:
+        # Imported here rather than at module load: the SDK alone takes most of a cold start.
+        import httpx
+        from openai import AsyncOpenAI
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+        # Retries are left to llm_scheduler, which also sees the rate limit and circuit state.
+        client = AsyncOpenAI(api_key=key, base_url=base_url, http_client=http_client, max_retries=0)
+        llm_clients[(key, base_url)] = client
+    return client
+
+MODEL_NAME = "deepseek-chat"
+
+def cache_variant(custom_prompt_template, custom_system_prompt, base_url):
+    """
+    Returns a short hash of everything besides the word that shapes a generation. Cache entries
+    are keyed by word and variant, so editing the prompts never serves output of the old ones.
+    """
+    source = "\0".join([custom_prompt_template.strip(), custom_system_prompt.strip(), MODEL_NAME, base_url])
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+# Entries from before prompt variants were made with the prompts saved at the time, so they
+# are labelled with the variant of the saved prompts (on the default base URL) when migrated.
+LEGACY_VARIANT = cache_variant(settings.prompt_template, settings.system_prompt, DEFAULT_BASE_URL)
+
+# One history shared by every session, so a word generated for one user is a cache hit
+# for everyone. Sessions only keep their position in it (history_index_state).
+history = load_cache()
+
+AUDIO_OUTPUT_DIR = "generated_audio"
+AUDIO_MAX_CONNECTIONS = int(os.environ.get("AUDIO_MAX_CONNECTIONS", "50"))
+AUDIO_TIMEOUT = float(os.environ.get("AUDIO_TIMEOUT", "15"))
+AUDIO_CONNECT_TIMEOUT = float(os.environ.get("AUDIO_CONNECT_TIMEOUT", "5"))
+AUDIO_CACHE_MAX_MB = float(os.environ.get("AUDIO_CACHE_MAX_MB", "200"))
+# How long a text the upstream could not voice is answered from the negative cache.
+AUDIO_NEGATIVE_TTL = float(os.environ.get("AUDIO_NEGATIVE_TTL", "86400"))
+
+audio_cache = AudioCache(AUDIO_OUTPUT_DIR, max_bytes=int(AUDIO_CACHE_MAX_MB * 1024 * 1024), negative_ttl=AUDIO_NEGATIVE_TTL)
+
+# Shared HTTP client for audio downloads; HTTP/2 is used when the h2 package is installed.
+audio_client = None
+
+def get_audio_client():
+    """Returns the shared audio download client, creating it on first use."""
+    global audio_client
+    if audio_client is None:
+        import httpx
+
+        audio_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=AUDIO_MAX_CONNECTIONS),
+            timeout=httpx.Timeout(AUDIO_TIMEOUT, connect=AUDIO_CONNECT_TIMEOUT),
+        )
+    return audio_client
+
+# All LLM and audio calls go through a scheduler with a rate limit, a concurrency cap, retries
+# with backoff and a circuit breaker. Interactive calls are served before prefetch and warm-up work.
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "600"))
+LLM_BURST = int(os.environ.get("LLM_BURST", "20"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "32"))
+# Slots only interactive calls may use, so background work cannot hold all of them.
+LLM_RESERVED_INTERACTIVE = int(os.environ.get("LLM_RESERVED_INTERACTIVE", "4"))
+AUDIO_REQUESTS_PER_MINUTE = float(os.environ.get("AUDIO_REQUESTS_PER_MINUTE", "0"))
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get("UPSTREAM_FAILURE_THRESHOLD", "5"))
+UPSTREAM_COOLDOWN = float(os.environ.get("UPSTREAM_COOLDOWN", "30"))
+
+RETRYABLE_STATUS = frozenset([408, 409, 429, 500, 502, 503, 504])
+
+def is_retryable(exc):
+    """Whether an upstream error is transient: a connection problem, timeout, rate limit or 5xx."""
+    # An error from openai or httpx means they were imported by the client that raised it.
+    openai, httpx = sys.modules.get("openai"), sys.modules.get("httpx")
+    if httpx is not None:
+        if isinstance(exc, httpx.TransportError):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS
+    if openai is not None:
+        if isinstance(exc, openai.APIConnectionError):
+            return True
+        return isinstance(exc, openai.APIStatusError) and exc.status_code in RETRYABLE_STATUS
+    return False
+
+llm_scheduler = UpstreamScheduler(
+    "The AI service",
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    rate=LLM_REQUESTS_PER_MINUTE / 60,
+    burst=LLM_BURST,
+    reserved=LLM_RESERVED_INTERACTIVE,
+    max_retries=UPSTREAM_MAX_RETRIES,
+    failure_threshold=UPSTREAM_FAILURE_THRESHOLD,
+    cooldown=UPSTREAM_COOLDOWN,
+    is_retryable=is_retryable,
+    on_retry=lambda exc, attempt, delay: UPSTREAM_RETRIES.inc(upstream="llm"),
+)
+audio_scheduler = UpstreamScheduler(
+    "The pronunciation service",
+    max_concurrency=AUDIO_MAX_CONNECTIONS,
+    rate=AUDIO_REQUESTS_PER_MINUTE / 60,
+    burst=AUDIO_MAX_CONNECTIONS,
+    max_retries=UPSTREAM_MAX_RETRIES,
+    failure_threshold=UPSTREAM_FAILURE_THRESHOLD,
+    cooldown=UPSTREAM_COOLDOWN,
+    is_retryable=is_retryable,
+    on_retry=lambda exc, attempt, delay: UPSTREAM_RETRIES.inc(upstream="audio"),
+)
+
+metrics.Gauge(
+    "sentence_generator_upstream_queued", "Upstream calls waiting for the scheduler.", ["upstream", "priority"],
+    callback=lambda: {
+        (upstream, priority.name.lower()): count
+        for upstream, scheduler in (("llm", llm_scheduler), ("audio", audio_scheduler))
+        for priority, count in scheduler.waiting().items()
+    },
+)
+metrics.Gauge(
+    "sentence_generator_upstream_circuit_open", "Whether calls to an upstream are currently refused.", ["upstream"],
+    callback=lambda: {("llm",): int(llm_scheduler.state == "open"), ("audio",): int(audio_scheduler.state == "open")},
+)
+
+# In-flight audio downloads, keyed by the audio cache key.
+audio_flights = SingleFlight()
+
+# Youdao pronunciation endpoint; AUDIO_BASE_URL can point it at a local stand-in for benchmarks.
+AUDIO_BASE_URL = os.environ.get("AUDIO_BASE_URL", "https://dict.youdao.com/dictvoice")
+
+def generate_audio_url(text, pronunciation='us'):
+    """生成有道发音API的音频URL，支持单词或句子"""
+    base_url = f'{AUDIO_BASE_URL}?audio='
+    if pronunciation == 'uk':
+        return f"{base_url}{text}&type=1"
+    elif pronunciation == 'us':
+        return f"{base_url}{text}&type=2"
+    else:
+        return None
+
+async def get_audio_file(text, pronunciation='us'):
+    """获取音频文件，优先从本地缓存读取，否则从API下载。"""
+    audio_path = audio_cache.lookup(text, pronunciation)
+    if audio_path:
+        return audio_path
+    if audio_cache.is_known_missing(text, pronunciation):
+        return None
+
+    # Concurrent requests for the same file share one download.
+    return await audio_flights.do(audio_cache.key(text, pronunciation), download_audio_file, text, pronunciation)
+
+async def download_audio_file(text, pronunciation):
+    """从有道发音API下载音频文件并存入音频缓存。"""
+    url = generate_audio_url(text, pronunciation)
+    if not url:
+        return None
+
+    try:
+        response = await audio_scheduler.call(fetch_audio, url)
+        if response.status_code == 200 and 'audio' in response.headers.get('Content-Type', ''):
+            return await asyncio.to_thread(audio_cache.store, text, pronunciation, response.content)
+        else:
+            # The upstream cannot voice this text; do not ask again until the negative TTL expires.
+            UPSTREAM_ERRORS.inc(upstream="audio", kind=f"http_{response.status_code}" if response.status_code != 200 else "not_audio")
+            await asyncio.to_thread(audio_cache.remember_missing, text, pronunciation)
+            return None
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(upstream="audio", kind=type(e).__name__)
+        print(f"Error fetching audio for '{text}': {e}")
+        return None
+
+async def fetch_audio(url):
+    """Requests an audio URL, raising on transient HTTP errors so the scheduler retries them."""
+    response = await get_audio_client().get(url)
+    if response.status_code in RETRYABLE_STATUS:
+        response.raise_for_status()
+    return response
+
+async def resolve_audio(entry):
+    """Returns a playable audio file for a history entry, fetching it again if it was evicted."""
+    if entry.audio_path and os.path.exists(entry.audio_path):
+        return entry.audio_path
+    return await get_audio_file(entry.word)
+
+class MalformedGeneration(ValueError):
+    """The model's JSON does not have the shape the prompt asks for."""
+
+def parse_generation(data):
+    """
+    Picks the sentence, phonetics and (part of speech, definition) pairs out of one parsed
+    generation, skipping incomplete translations. Raises MalformedGeneration if a field has the wrong type.
+    """
+    if not isinstance(data, dict):
+        raise MalformedGeneration(f"expected a JSON object, got {type(data).__name__}")
+    sentence = data.get("sentence", "No sentence generated.")
+    phonetics = data.get("phonetics", "No phonetics found.")
+    raw_translations = data.get("translations") or []
+    for field, value, expected in (("sentence", sentence, str), ("phonetics", phonetics, str), ("translations", raw_translations, list)):
+        if not isinstance(value, expected):
+            raise MalformedGeneration(f'"{field}" should be a {expected.__name__}, got {type(value).__name__}')
+    translations = []
+    for t in raw_translations:
+        if not isinstance(t, dict):
+            continue
+        pos = t.get('partOfSpeech', '')
+        definition = t.get('definition', '')
+        if pos and definition and isinstance(pos, str) and isinstance(definition, str):
+            translations.append((pos, definition))
+    return sentence, phonetics, tuple(translations)
+
+def render_translation_text(phonetics, translations):
+    """The markdown for the word details: the phonetics, then one line per translation."""
+    translation_details = [f"**{pos}** {definition}" for pos, definition in translations]
+    if not translation_details:
+        return f"**音标:** {phonetics}\n\nNo translation found."
+    return f"**音标:** {phonetics}\n\n" + "\n".join(translation_details)
+
+# Stream completions into the UI field by field; set STREAM_GENERATION=0 to wait for the full response.
+STREAM_GENERATION = os.environ.get("STREAM_GENERATION", "1") != "0"
+
+async def timed(stage, awaitable):
+    """Awaits awaitable, recording its duration as a generation stage."""
+    with metrics.timed_stage(STAGE_SECONDS, stage):
+        return await awaitable
+
+def record_usage(usage):
+    """Counts the tokens reported for a completion."""
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, type="completion")
+
+async def stream_completion_content(client, messages, on_progress):
+    """
+    Streams a JSON completion, calling on_progress(key, value) for each top-level field
+    as soon as it is complete. Returns the full response content.
+    """
+    stream = await client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        response_format={"type": "json_object"}
+    )
+    fields = JsonFieldStream()
+    parts = []
+    async for chunk in stream:
+        # The usage arrives in a final chunk without choices.
+        record_usage(getattr(chunk, "usage", None))
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        delta = chunk.choices[0].delta.content
+        parts.append(delta)
+        for key, value in fields.feed(delta):
+            on_progress(key, value)
+    return "".join(parts)
+
+async def generate_sentence_and_translation(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress=None):
+    """
+    Generates a sentence, translation, phonetics, and audio for the input word.
+    Returns (sentence, phonetics, translations, audio_path), or (error message, None, None, None).
+    If on_progress is given, the completion is streamed and each response field is passed
+    to on_progress(key, value) as soon as it arrives.
+    """
+    key_to_use = current_api_key or settings.api_key
+    if not key_to_use:
+        return "Error: Please enter or save your DeepSeek API key below.", None, None, None
+    if not word:
+        return "Please enter a word.", None, None, None
+
+    try:
+        client = get_llm_client(key_to_use, base_url)
+        prompt = custom_prompt_template.format(word=word)
+        messages = [
+            {"role": "system", "content": custom_system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        # The audio only needs the word, so fetch it while the completion is in flight.
+        if on_progress is None:
+            response, audio_path = await asyncio.gather(
+                timed("llm", llm_scheduler.call(lambda: client.chat.completions.create(
+                    model=MODEL_NAME,
+                    messages=messages,
+                    stream=False,
+                    response_format={"type": "json_object"}
+                ))),
+                timed("audio", get_audio_file(word)),
+            )
+            record_usage(response.usage)
+            content = response.choices[0].message.content
+        else:
+            content, audio_path = await asyncio.gather(
+                timed("llm", llm_scheduler.call(stream_completion_content, client, messages, on_progress)),
+                timed("audio", get_audio_file(word)),
+            )
+
+        with metrics.timed_stage(STAGE_SECONDS, "parse"):
+            data = json.loads(content)
+            sentence, phonetics, translations = parse_generation(data)
+
+        return sentence, phonetics, translations, audio_path
+
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(upstream="llm", kind=type(e).__name__)
+        error_message = f"An error occurred: {e}"
+        if "Incorrect API key" in str(e):
+            error_message = "Error: The provided API key is incorrect."
+        elif isinstance(e, CircuitOpenError):
+            error_message = f"Error: {e}"
+        elif "openai" in sys.modules and isinstance(e, sys.modules["openai"].RateLimitError):
+            error_message = "Error: The AI service is rate limiting requests. Please try again in a moment."
+        elif isinstance(e, json.JSONDecodeError):
+            error_message = "Error: Failed to parse the response from the API. The API may not have returned valid JSON."
+        elif isinstance(e, MalformedGeneration):
+            error_message = f"Error: The API response is not in the expected format: {e}."
+        return error_message, None, None, None
+
+BATCH_PROMPT_TEMPLATE = """
+Answer the request below separately for each of these words: {words}
+
+{instructions}
+
+Return a JSON object of the form {{"entries": [...]}}. The "entries" array must hold one object
+per word, in the same order, each in the format described above plus a "word" field with the word it is for.
+"""
+
+def build_batch_prompt(words, custom_prompt_template):
+    """Builds a prompt that asks for several words at once, based on the single-word prompt template."""
+    return BATCH_PROMPT_TEMPLATE.format(
+        words=json.dumps(words, ensure_ascii=False),
+        instructions=custom_prompt_template.format(word="<word>"),
+    )
+
+async def generate_batch(words, current_api_key, base_url, custom_prompt_template, custom_system_prompt):
+    """
+    Generates sentences, translations, phonetics, and audio for several words with one completion.
+    Returns a dict mapping each word to (sentence, phonetics, translations, audio_path); words the
+    response does not cover are left out. Errors are raised to the caller.
+    """
+    key_to_use = current_api_key or settings.api_key
+    if not key_to_use:
+        raise ValueError("No DeepSeek API key configured.")
+
+    client = get_llm_client(key_to_use, base_url)
+    try:
+        response, audio_paths = await asyncio.gather(
+            timed("llm", llm_scheduler.call(lambda: client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": custom_system_prompt},
+                    {"role": "user", "content": build_batch_prompt(words, custom_prompt_template)},
+                ],
+                stream=False,
+                response_format={"type": "json_object"}
+            ))),
+            timed("audio", asyncio.gather(*(get_audio_file(word) for word in words))),
+        )
+        record_usage(response.usage)
+        data = json.loads(response.choices[0].message.content)
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(upstream="llm", kind=type(e).__name__)
+        raise
+
+    audio_by_word = dict(zip(words, audio_paths))
+    entries = data.get("entries") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise MalformedGeneration('expected a JSON object with an "entries" array')
+    results = {}
+    for item in entries:
+        word = item.get("word") if isinstance(item, dict) else None
+        if not isinstance(word, str) or word not in audio_by_word or word in results:
+            continue
+        try:
+            results[word] = (*parse_generation(item), audio_by_word[word])
+        except MalformedGeneration as e:
+            # Only this word is left out; the caller retries it.
+            print(f"Skipping malformed batch entry for '{word}': {e}")
+    return results
+
+# In-flight generations, keyed by word, cache variant and API key.
+generation_flights = SingleFlight()
+
+metrics.Gauge(
+    "sentence_generator_in_flight", "Upstream generations and audio downloads in progress.", ["kind"],
+    callback=lambda: {("generation",): len(generation_flights), ("audio",): len(audio_flights)},
+)
+
+async def generate_entry(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress=None):
+    """
+    Generates a new entry for the word and stores it in the history and cache.
+    Concurrent calls for the same word and prompts share a single generation, whatever its
+    capitalization ("The" and "the"); only the caller that started it receives on_progress callbacks.
+    Returns (index, None), or (-1, error message) if the generation failed.
+    """
+    flight_key = (
+        fold(word),
+        cache_variant(custom_prompt_template, custom_system_prompt, base_url),
+        current_api_key or settings.api_key,
+    )
+    return await generation_flights.do(
+        flight_key, _generate_entry, word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress
+    )
+
+async def _generate_entry(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress=None):
+    sentence, phonetics, translations, audio_path = await generate_sentence_and_translation(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress)
+
+    if translations is None or not sentence.split():
+        return -1, sentence
+
+    variant = cache_variant(custom_prompt_template, custom_system_prompt, base_url)
+    return await store_entry(word, variant, sentence, phonetics, translations, audio_path), None
+
+async def stream_entry(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, log=None):
+    """
+    Runs generate_entry for the UI. Yields (key, value) for each response field as it streams
+    in (when STREAM_GENERATION is on), then ("result", (index, error_message)).
+    Stage timings are added to log, if given.
+    """
+    progress = asyncio.Queue()
+    on_progress = (lambda key, value: progress.put_nowait((key, value))) if STREAM_GENERATION else None
+    task = asyncio.ensure_future(metrics.with_request_log(
+        log, generate_entry(word, current_api_key, base_url, custom_prompt_template, custom_system_prompt, on_progress)
+    ))
+    task.add_done_callback(lambda _: progress.put_nowait(None))
+    while (item := await progress.get()) is not None:
+        yield item
+    yield "result", task.result()
+
+async def store_entry(word, variant, sentence, phonetics, translations, audio_path):
+    """Adds or replaces the history entry for a word and variant, saves it to the cache and returns its index."""
+    # Keep one entry per folded word: regenerating "The" replaces a cached "the" under its cached spelling.
+    existing = history.lookup(word, variant)
+    if existing != -1 and fold(history[existing].word) == fold(word):
+        word = history[existing].word
+    new_entry = Entry(word, variant, sentence, phonetics, tuple(translations), audio_path)
+    # Update the entry if the word and variant exist, otherwise append.
+    index = history.upsert(new_entry)
+    await save_cache(new_entry)  # Save the new entry to the cache
+    return index
+
+def clean_word(word):
+    """Removes common trailing punctuation from a word."""
+    return word.strip(".,!?;:'\"- ")
+
+# Function words are rarely worth a speculative generation.
+PREFETCH_STOP_WORDS = FUNCTION_WORDS
+PREFETCH_MAX_CONCURRENCY = int(os.environ.get("PREFETCH_MAX_CONCURRENCY", "2"))
+# Maximum number of speculative generations per session; 0 disables prefetching.
+PREFETCH_SESSION_BUDGET = int(os.environ.get("PREFETCH_SESSION_BUDGET", "50"))
+
+prefetcher = Prefetcher(
+    generate=lambda word, *args: with_priority(Priority.PREFETCH, generate_entry(word, *args)),
+    is_cached=lambda word, current_api_key, base_url, custom_prompt_template, custom_system_prompt: (
+        history.lookup(word, cache_variant(custom_prompt_template, custom_system_prompt, base_url)) != -1
+    ),
+    max_concurrency=PREFETCH_MAX_CONCURRENCY,
+    session_budget=PREFETCH_SESSION_BUDGET,
+)
+
+def prefetch_candidates(words, current_word):
+    """Returns the cleaned words of a sentence worth prefetching, without stop words or repeats."""
+    candidates = []
+    for word in words:
+        word = clean_word(word)
+        if word and word != current_word and word.lower() not in PREFETCH_STOP_WORDS and word not in candidates:
+            candidates.append(word)
+    return candidates
+
+def finish_request(handler, cache, started, log, **fields):
+    """Records the latency of a UI event or API request and emits its request log line, if enabled."""
+    REQUEST_SECONDS.observe(time.perf_counter() - started, handler=handler, cache=cache)
+    if log is not None:
+        log.emit(cache=cache, **fields)
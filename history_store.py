@@ -0,0 +1,442 @@
+import json
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+
+from file_lock import locked
+from word_index import WordIndex
+
+
+@dataclass(slots=True)
+class Entry:
+    """
+    One cached generation, as the model returned it. The words for the buttons and the
+    markdown of the word details are derived from it when the entry is shown.
+    """
+    word: str
+    variant: str | None
+    sentence: str
+    phonetics: str
+    # ((part of speech, definition), ...)
+    translations: tuple
+    audio_path: str | None = None
+
+    @property
+    def words(self):
+        return self.sentence.split()
+
+    def to_record(self):
+        """The JSON form of the entry stored in the cache journal."""
+        return {
+            "word": self.word,
+            "variant": self.variant,
+            "sentence": self.sentence,
+            "phonetics": self.phonetics,
+            "translations": [list(pair) for pair in self.translations],
+            "audio_path": self.audio_path,
+        }
+
+    @classmethod
+    def from_record(cls, record, default_variant=None):
+        """Builds an entry from a journal record, including records from before entries were structured."""
+        if "translation_text" in record:
+            phonetics, translations = parse_translation_text(record["translation_text"])
+        else:
+            phonetics, translations = record["phonetics"], record["translations"]
+        return cls(
+            word=record["word"],
+            variant=record.get("variant") or default_variant,
+            sentence=record["sentence"],
+            phonetics=phonetics,
+            # Parts of speech repeat across the whole history; share one string for each.
+            translations=tuple((sys.intern(pos), definition) for pos, definition in translations),
+            audio_path=record.get("audio_path"),
+        )
+
+
+TRANSLATION_LINE = re.compile(r"\*\*(.+?)\*\* (.*)")
+
+
+def parse_translation_text(translation_text):
+    """
+    Recovers the phonetics and the (part of speech, definition) pairs from the details
+    markdown that old cache records stored instead of the structured fields.
+    """
+    header, _, body = translation_text.partition("\n\n")
+    phonetics = header.removeprefix("**音标:** ")
+    translations = []
+    for line in body.splitlines():
+        match = TRANSLATION_LINE.fullmatch(line)
+        if match:
+            translations.append((match[1], match[2]))
+    return phonetics, translations
+
+
+def entry_key(entry):
+    """The cache key of an entry: its word and the prompt variant it was generated with."""
+    return entry.word, entry.variant
+
+
+def record_key(record):
+    """entry_key for a journal record."""
+    return record["word"], record.get("variant")
+
+
+class HistoryStore:
+    """
+    The generation history: an ordered list of entries plus a (word, variant) -> position
+    index, so cache lookups do not have to scan the whole history. Several prompt variants
+    of the same word live side by side. Safe to share between sessions.
+
+    If word_forms is given (see normalize.word_forms), an alias table maps every normalized
+    form of each cached word to its entry, and lookup() falls back to it on an exact miss.
+    search_words() offers the cached words for a typeahead (see word_index.WordIndex).
+    """
+
+    def __init__(self, entries=None, word_forms=None):
+        self._entries = []
+        self._positions = {}
+        self._aliases = {}
+        self._word_index = WordIndex()
+        self._index_words = False
+        self._variants = set()
+        self._word_forms = word_forms
+        self._lock = threading.RLock()
+        self.reload(entries or [])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def reload(self, entries):
+        """Replaces the whole history and rebuilds the index."""
+        entries = list(entries)
+        positions = {}
+        aliases = {}
+        for i, entry in enumerate(entries):
+            # Keep the first occurrence, like the old linear scan did.
+            positions.setdefault(entry_key(entry), i)
+            self._add_aliases(aliases, entry, i)
+        word_index = WordIndex(entry.word for entry in entries)
+        variants = {entry.variant for entry in entries}
+        with self._lock:
+            self._entries = entries
+            self._positions = positions
+            self._aliases = aliases
+            self._word_index = word_index
+            self._variants = variants
+            if self._index_words:
+                self.index_words()
+
+    def find(self, word, variant=None):
+        """Returns the position of the entry for a word and variant, or -1 if it is not cached."""
+        return self._positions.get((word, variant), -1)
+
+    def lookup(self, word, variant=None):
+        """
+        Like find, but on a miss falls back to an entry whose word shares a normalized form,
+        so "Spending" and "spend" hit the cached "spending".
+        """
+        index = self.find(word, variant)
+        if index != -1 or self._word_forms is None:
+            return index
+        for form in self._word_forms(word):
+            index = self._aliases.get((form, variant), -1)
+            if index != -1:
+                return index
+        return -1
+
+    def locate(self, word, variant=None):
+        """
+        Like lookup, but falls back to the word's entry made with another variant, e.g. for
+        a word picked from search_words(). Returns -1 only if the word is not cached at all.
+        """
+        index = self.lookup(word, variant)
+        if index != -1:
+            return index
+        for other in list(self._variants):
+            index = self.find(word, other)
+            if index != -1:
+                return index
+        return -1
+
+    def search_words(self, text, limit=10):
+        """
+        Cached words starting with text, then cached words text may be a misspelling of. Only
+        the former until index_words() has finished.
+        """
+        return self._word_index.search(text, limit)
+
+    def index_words(self):
+        """
+        Builds the typo index of search_words() in a background thread, now and whenever the
+        word index is rebuilt.
+        """
+        self._index_words = True
+        threading.Thread(target=self._word_index.build_deletions, name="word-index", daemon=True).start()
+
+    def append(self, entry):
+        """Adds an entry to the end of the history and returns its position."""
+        with self._lock:
+            self._entries.append(entry)
+            index = len(self._entries) - 1
+            self._positions.setdefault(entry_key(entry), index)
+            self._add_aliases(self._aliases, entry, index)
+            self._word_index.add(entry.word)
+            self._variants.add(entry.variant)
+            return index
+
+    def replace(self, index, entry):
+        """Overwrites the entry at a position, keeping the index in sync."""
+        with self._lock:
+            old_key = entry_key(self._entries[index])
+            new_key = entry_key(entry)
+            self._entries[index] = entry
+            if old_key != new_key and self._positions.get(old_key) == index:
+                del self._positions[old_key]
+                # Fall back to a later duplicate of the old key, if the history has one.
+                for i, other in enumerate(self._entries):
+                    if entry_key(other) == old_key:
+                        self._positions[old_key] = i
+                        break
+            if self._positions.get(new_key, index) >= index:
+                self._positions[new_key] = index
+            if old_key != new_key and self._word_forms is not None:
+                self._aliases = {}
+                for i, other in enumerate(self._entries):
+                    self._add_aliases(self._aliases, other, i)
+            if old_key != new_key:
+                self._word_index = WordIndex(other.word for other in self._entries)
+                self._variants.add(entry.variant)
+                if self._index_words:
+                    self.index_words()
+
+    def upsert(self, entry):
+        """Replaces the cached entry for the word and variant if there is one, otherwise appends it."""
+        with self._lock:
+            index = self.find(*entry_key(entry))
+            if index == -1:
+                return self.append(entry)
+            self.replace(index, entry)
+            return index
+
+    def _add_aliases(self, aliases, entry, index):
+        if self._word_forms is None:
+            return
+        for form in self._word_forms(entry.word):
+            aliases.setdefault((form, entry.variant), index)
+
+    def to_list(self):
+        """Returns the entries as a plain list, e.g. for serialization."""
+        with self._lock:
+            return list(self._entries)
+
+
+class CacheJournal:
+    """
+    Append-only JSON-lines storage for the generation history, as records (Entry.to_record).
+
+    Every new or regenerated entry is appended as one line, so a write costs the size of
+    the entry rather than the size of the history. On load, a later line for the same word
+    and variant replaces the earlier one in place. A line torn by a crash is dropped and cut off the file.
+    The journal is rewritten (compacted) atomically once it holds too many stale lines.
+
+    Several processes can share one journal: writes, compaction and the crash cleanup on load
+    hold an exclusive lock on a lock file next to it, and refresh() returns the lines other
+    processes appended since this one last read, at the cost of one stat when nothing changed.
+    Writes may wait for that lock, so they can run in another thread; refresh() never waits
+    for one in progress.
+    """
+
+    def __init__(self, path, legacy_path=None, compact_min_records=1000, compact_ratio=2.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lock_path = path + ".lock"
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        self.record_count = 0
+        # The file and the byte offset this process has read up to.
+        self._file_id = None
+        self._offset = 0
+        # Guards the above between a writing thread and refresh().
+        self._state_lock = threading.Lock()
+
+    def load(self, upgrade=None):
+        """
+        Replays the journal and returns the current records in history order.
+        If upgrade(records) returns a new list of records, e.g. in a newer format, the journal
+        is rewritten with it before any other process can write, and it is returned instead.
+        """
+        with self._state_lock, self._locked():
+            records = self._load()
+            upgraded = upgrade(records) if upgrade is not None else None
+            if upgraded is None:
+                return records
+            self._rewrite(upgraded)
+            return upgraded
+
+    def refresh(self):
+        """
+        Returns the records appended by other processes since the last load or refresh, in
+        journal order, or all records if the journal was rewritten (compacted) meanwhile.
+        Returns nothing while this process is writing; the next call picks the records up.
+        """
+        if not self._state_lock.acquire(blocking=False):
+            return []
+        try:
+            return self._refresh()
+        finally:
+            self._state_lock.release()
+
+    def _refresh(self):
+        generation = self._generation()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._file_id == (stat.st_dev, stat.st_ino, generation) and stat.st_size == self._offset:
+            return []
+        with open(self.path, "rb") as f:
+            file_id = self._identify(f, generation)
+            if file_id != self._file_id:
+                self._file_id, self._offset, self.record_count = file_id, 0, 0
+            f.seek(self._offset)
+            records, consumed = self._read_lines(f)
+        self._offset += consumed
+        self.record_count += len(records)
+        return records
+
+    def append(self, record):
+        """Durably appends one record to the journal."""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._state_lock, self._locked(), open(self.path, "ab") as f:
+            caught_up = self._identify(f) == self._file_id and os.fstat(f.fileno()).st_size == self._offset
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            if caught_up:
+                # Nothing new from other processes, so refresh() need not read our own line back.
+                self._offset += len(line)
+                self.record_count += 1
+
+    def needs_compaction(self, live_count):
+        """Whether the journal holds enough superseded lines to be worth rewriting."""
+        return (self.record_count >= self.compact_min_records
+                and self.record_count > live_count * self.compact_ratio)
+
+    def compact(self):
+        """Rewrites the journal with one line per entry, replacing the file atomically."""
+        with self._state_lock, self._locked():
+            self._rewrite(self._load())
+
+    def rewrite(self, records):
+        """Atomically replaces the whole journal with the given records."""
+        with self._state_lock, self._locked():
+            self._rewrite(records)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            self._migrate_legacy()
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, "rb") as f:
+            file_id = self._identify(f)
+            size = os.fstat(f.fileno()).st_size
+            records, consumed = self._read_lines(f)
+        if consumed < size:
+            # A write torn by a crash (other writers are locked out): drop it so the next
+            # append starts on a clean line.
+            with open(self.path, "r+b") as f:
+                f.truncate(consumed)
+        self._file_id, self._offset, self.record_count = file_id, consumed, len(records)
+
+        latest = _Latest()
+        for record in records:
+            latest.upsert(record)
+        return latest.records
+
+    def _read_lines(self, f):
+        # Reads the complete lines from the current position; returns (records, bytes consumed).
+        records = []
+        consumed = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Torn by a crash, or still being written by another process.
+                break
+            consumed += len(line)
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"Skipping corrupted line in {self.path}")
+        return records, consumed
+
+    def _rewrite(self, records):
+        tmp_path = self.path + ".tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Inode numbers get reused, so every rewrite also bumps a generation number (the size of
+        # the lock file). The file changed under our read position, so the next refresh() reads it whole.
+        with open(self.lock_path, "ab") as f:
+            f.write(b"\0")
+        self.record_count = count
+
+    def _generation(self):
+        try:
+            return os.stat(self.lock_path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _identify(self, f, generation=None):
+        # Which version of the journal an open file is. Pass the generation read before
+        # opening the file when not holding the lock.
+        stat = os.fstat(f.fileno())
+        return stat.st_dev, stat.st_ino, self._generation() if generation is None else generation
+
+    def _locked(self):
+        return locked(self.lock_path)
+
+    def _migrate_legacy(self):
+        """One-time import of the old single-document JSON cache."""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Could not migrate {self.legacy_path}: {e}")
+            return
+        latest = _Latest()
+        for entry in entries:
+            latest.upsert(entry)
+        self._rewrite(latest.records)
+
+
+class _Latest:
+    # The latest record per word and variant, at the position of the first one.
+
+    def __init__(self):
+        self.records = []
+        self._positions = {}
+
+    def upsert(self, record):
+        key = record_key(record)
+        index = self._positions.get(key)
+        if index is None:
+            self._positions[key] = len(self.records)
+            self.records.append(record)
+        else:
+            self.records[index] = record
@@ -0,0 +1,57 @@
+import json
+
+
+class JsonFieldStream:
+    """
+    Incrementally scans a JSON object that arrives in chunks and reports each top-level
+    field as soon as its value is complete, without waiting for the closing brace.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        """Adds a chunk of the response and returns the (key, value) pairs it completed."""
+        self._text += chunk
+        fields = []
+        for i in range(self._pos, len(self._text)):
+            c = self._text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                if self._depth == 0 and c == "{":
+                    self._member_start = i + 1
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    fields.extend(self._close_member(i))
+                    self._member_start = None
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                fields.extend(self._close_member(i))
+                self._member_start = i + 1
+        self._pos = len(self._text)
+        return fields
+
+    def _close_member(self, end):
+        if self._member_start is None:
+            return []
+        member = self._text[self._member_start:end].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except ValueError:
+            return []
@@ -0,0 +1,112 @@
+"""
+Offline word normalization for cache lookups.
+
+word_forms() maps a surface form to the forms it may be cached under: the case-folded word
+and the base forms a rule-based lemmatizer guesses for it. Two words are treated as the same
+cache entry when their forms overlap, so "Spending", "spending" and "spend" all find each other.
+The rules are deliberately generous; a guessed form only matters if it matches a cached word.
+"""
+
+IRREGULAR_FORMS = {
+    "ate": "eat", "began": "begin", "begun": "begin", "bought": "buy", "broke": "break",
+    "broken": "break", "brought": "bring", "built": "build", "came": "come", "caught": "catch",
+    "children": "child", "chose": "choose", "chosen": "choose", "did": "do", "does": "do",
+    "done": "do", "driven": "drive", "drove": "drive", "eaten": "eat", "feet": "foot",
+    "fell": "fall", "felt": "feel", "flew": "fly", "forgot": "forget", "fought": "fight",
+    "found": "find", "gave": "give", "given": "give", "goes": "go", "gone": "go", "got": "get",
+    "gotten": "get", "grew": "grow", "heard": "hear", "held": "hold", "kept": "keep",
+    "knew": "know", "known": "know", "lost": "lose", "made": "make", "meant": "mean",
+    "men": "man", "met": "meet", "mice": "mouse", "paid": "pay", "people": "person",
+    "ran": "run", "said": "say", "sang": "sing", "sat": "sit", "saw": "see", "seen": "see",
+    "sent": "send", "slept": "sleep", "sold": "sell", "spent": "spend", "spoke": "speak",
+    "spoken": "speak", "stood": "stand", "sung": "sing", "swam": "swim", "taken": "take",
+    "taught": "teach", "teeth": "tooth", "thought": "think", "threw": "throw",
+    "thrown": "throw", "told": "tell", "took": "take", "understood": "understand", "went": "go",
+    "women": "woman", "won": "win", "wore": "wear", "written": "write", "wrote": "write",
+}
+
+# Words that look inflected but are not, and would otherwise match an unrelated shorter word.
+NOT_INFLECTED = frozenset([
+    "news", "series", "species", "physics", "mathematics", "always", "perhaps", "towards", "clothes",
+    "evening", "morning", "during", "early", "reply", "united", "wicked", "naked", "sacred",
+    "crooked", "rugged", "ragged", "wretched", "beloved", "hundred",
+])
+
+# A plural or third-person -es follows these; otherwise the e belongs to the stem (hates, cares).
+ES_STEM_ENDINGS = ("s", "x", "z", "ch", "sh", "o")
+
+# Function words: never guessed as the base form of another word, so "thing" is not cached
+# under "the", nor "being" under "bee".
+FUNCTION_WORDS = frozenset("""
+a an the and or but if so as of at by for from in into on onto to up with about
+i me my we us our you your he him his she her it its they them their this that these those
+is am are was were be been being do does did have has had will would can could shall should may might must
+not no yes there here what which who whom whose when where why how than then too very just
+""".split())
+
+MIN_STEM = 3
+
+
+def fold(word):
+    """Case-folds a word and drops a possessive ending."""
+    word = word.casefold().replace("’", "'")
+    if word.endswith("'s"):
+        word = word[:-2]
+    return word
+
+
+def _undouble(stem):
+    # stopped -> stopp -> stop, running -> runn -> run
+    if len(stem) > MIN_STEM and stem[-1] == stem[-2] and stem[-1] not in "aeiouls":
+        return stem[:-1]
+    return None
+
+
+def lemma_candidates(word):
+    """Guesses the base forms of an already folded word."""
+    candidates = []
+
+    def add(stem, suffix="", min_length=MIN_STEM):
+        if stem and len(stem + suffix) >= min_length:
+            candidates.append(stem + suffix)
+
+    if word in IRREGULAR_FORMS:
+        candidates.append(IRREGULAR_FORMS[word])
+    if word in NOT_INFLECTED:
+        return candidates
+
+    if word.endswith(("ies", "ied")):
+        add(word[:-3], "y")
+    elif word.endswith("es"):
+        # Longer guesses first: word_forms() tries them in order.
+        add(word[:-1])
+        if word[:-2].endswith(ES_STEM_ENDINGS):
+            add(word[:-2])
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        add(word[:-1])
+    elif word.endswith(("ing", "ed")):
+        stem = word[:-3] if word.endswith("ing") else word[:-2]
+        # Three-letter guesses from -ing/-ed are mostly wrong: thing/the, seed/see, shed/she.
+        add(stem, "e", min_length=MIN_STEM + 1)
+        add(stem, min_length=MIN_STEM + 1)
+        add(_undouble(stem))
+    elif word.endswith(("ier", "iest")):
+        # Plain -er/-est is left alone: "number" is not a form of "numb".
+        add(word[:word.rindex("i")], "y")
+    elif word.endswith("ily"):
+        add(word[:-3], "y")
+    elif word.endswith("ly") and not word.endswith(("pply", "mply")):
+        # apply, supply, imply, comply: the ly is part of the word.
+        add(word[:-2])
+
+    return candidates
+
+
+def word_forms(word):
+    """Returns the folded word followed by its guessed base forms, without duplicates."""
+    folded = fold(word)
+    forms = [folded]
+    for candidate in lemma_candidates(folded):
+        if candidate not in forms and candidate not in FUNCTION_WORDS:
+            forms.append(candidate)
+    return forms
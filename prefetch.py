@@ -0,0 +1,62 @@
+import asyncio
+
+
+class Prefetcher:
+    """
+    Generates entries for the words of a sentence in the background, so that clicking
+    one of them is usually a cache hit.
+
+    Prefetches run with bounded concurrency across all sessions. Each session may spend at
+    most `session_budget` generations on prefetching, and scheduling a new sentence for a
+    session cancels whatever is still queued for its previous one.
+    """
+
+    def __init__(self, generate, is_cached, max_concurrency=2, session_budget=50):
+        # generate(word, *args) creates and caches the entry; is_cached(word, *args) checks the history.
+        self.generate = generate
+        self.is_cached = is_cached
+        self.session_budget = session_budget
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = {}
+        self._spent = {}
+
+    def schedule(self, session_id, words, *args):
+        """Replaces the session's pending prefetches with the uncached words of a new sentence."""
+        self.cancel(session_id)
+        if self.remaining_budget(session_id) <= 0:
+            return
+        tasks = set()
+        for word in words:
+            if self.is_cached(word, *args):
+                continue
+            task = asyncio.ensure_future(self._prefetch(session_id, word, args))
+            task.add_done_callback(self._report)
+            tasks.add(task)
+        if tasks:
+            self._tasks[session_id] = tasks
+
+    def cancel(self, session_id):
+        """Cancels the session's queued prefetches."""
+        for task in self._tasks.pop(session_id, ()):
+            task.cancel()
+
+    def end_session(self, session_id):
+        """Cancels the session's prefetches and forgets its budget."""
+        self.cancel(session_id)
+        self._spent.pop(session_id, None)
+
+    def remaining_budget(self, session_id):
+        return self.session_budget - self._spent.get(session_id, 0)
+
+    async def _prefetch(self, session_id, word, args):
+        async with self._semaphore:
+            # The word may have been generated, or the budget used up, while we were queued.
+            if self.is_cached(word, *args) or self.remaining_budget(session_id) <= 0:
+                return
+            self._spent[session_id] = self._spent.get(session_id, 0) + 1
+            await self.generate(word, *args)
+
+    @staticmethod
+    def _report(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Prefetch failed: {task.exception()}")
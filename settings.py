@@ -0,0 +1,111 @@
+import os
+
+# It's recommended to set the API key as an environment variable for security.
+# If the environment variable is not set, you will be prompted to enter it in the UI.
+API_KEY_FILE = ".api_key"
+INSTRUCTION_FILE = ".instruction_text"
+PROMPT_TEMPLATE_FILE = ".prompt_template"
+SYSTEM_PROMPT_FILE = ".system_prompt"
+
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+
+DEFAULT_INSTRUCTIONS = "Enter a word to generate a sentence. Click any word in the result to generate a new sentence with that word."
+
+DEFAULT_PROMPT_TEMPLATE = """
+For the word "{word}", provide the following in a JSON format:
+1. A simple English sentence using the word.
+2. The International Phonetic Alphabet (IPA) transcription.
+3. A list of its Chinese translations, including part of speech and definition.
+
+Example JSON format for the word "book":
+{{
+  "sentence": "I need to book a flight to Beijing.",
+  "phonetics": "/bʊk/",
+  "translations": [
+    {{
+      "partOfSpeech": "n.",
+      "definition": "书, 书籍; 卷, 册"
+    }},
+    {{
+      "partOfSpeech": "v.",
+      "definition": "预订, 预约"
+    }}
+  ]
+}}
+"""
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant that provides sentence examples, phonetics, and detailed translations with parts of speech in a JSON format. Use common abbreviations for parts of speech (e.g., n., v., adj.)."
+
+
+def _read(path, default, encoding="utf-8"):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding=encoding) as f:
+        return f.read().strip()
+
+
+def _write(path, text, encoding="utf-8"):
+    with open(path, "w", encoding=encoding) as f:
+        f.write(text)
+
+
+SETTINGS_FILES = (API_KEY_FILE, INSTRUCTION_FILE, PROMPT_TEMPLATE_FILE, SYSTEM_PROMPT_FILE)
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Settings:
+    """
+    The settings saved from the UI: API key, instruction text and prompts. refresh() reads
+    them again when another process (or an editor) changed their files, at the cost of a
+    stat per file when nothing changed. DEEPSEEK_API_KEY takes precedence over the .api_key
+    file until a key is saved from this process.
+    """
+
+    def __init__(self):
+        self._api_key_saved = False
+        self.reload()
+
+    def refresh(self):
+        """Reloads the settings if any of their files changed since they were last read."""
+        if any(_stamp(path) != stamp for path, stamp in self._stamps.items()):
+            self.reload()
+
+    def reload(self):
+        self._stamps = {path: _stamp(path) for path in SETTINGS_FILES}
+        environment_key = None if self._api_key_saved else os.environ.get("DEEPSEEK_API_KEY")
+        self.api_key = environment_key or _read(API_KEY_FILE, None, encoding=None)
+        self.instruction_text = _read(INSTRUCTION_FILE, DEFAULT_INSTRUCTIONS)
+        self.prompt_template = _read(PROMPT_TEMPLATE_FILE, DEFAULT_PROMPT_TEMPLATE)
+        self.system_prompt = _read(SYSTEM_PROMPT_FILE, DEFAULT_SYSTEM_PROMPT)
+
+    def save_api_key(self, key):
+        self._save(API_KEY_FILE, key, encoding=None)
+        self._api_key_saved = True
+        self.api_key = key
+
+    def save_instruction_text(self, text):
+        self._save(INSTRUCTION_FILE, text)
+        self.instruction_text = text
+
+    def save_prompt_template(self, template):
+        self._save(PROMPT_TEMPLATE_FILE, template)
+        self.prompt_template = template
+
+    def save_system_prompt(self, prompt):
+        self._save(SYSTEM_PROMPT_FILE, prompt)
+        self.system_prompt = prompt
+
+    def _save(self, path, text, encoding="utf-8"):
+        _write(path, text, encoding=encoding)
+        # Our own write is not a change for refresh() to pick up.
+        self._stamps[path] = _stamp(path)
+
+
+settings = Settings()
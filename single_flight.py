@@ -0,0 +1,28 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the work and
+    everyone arriving while it is in flight awaits the same task instead of repeating it.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    async def do(self, key, func, *args):
+        """Runs func(*args) unless a call with the same key is already running, and returns its result."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield the shared task so one caller going away does not cancel it for the others.
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
@@ -0,0 +1,201 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import random
+import time
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Scheduling classes for upstream calls; lower values are served first."""
+    INTERACTIVE = 0
+    PREFETCH = 1
+    # Warm-up jobs and batch API requests.
+    BULK = 2
+
+
+_priority = contextvars.ContextVar("upstream_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority():
+    return _priority.get()
+
+
+async def with_priority(priority, coro):
+    """Awaits coro with upstream calls made inside it scheduled at the given priority."""
+    token = _priority.set(priority)
+    try:
+        return await coro
+    finally:
+        _priority.reset(token)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst` calls."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def take(self):
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class UpstreamScheduler:
+    """
+    Central gate for the calls to one upstream service.
+
+    Calls wait in a priority queue (see Priority) and start only when a concurrency slot and a
+    rate-limit token are free; `reserved` slots are kept for interactive calls, so background
+    work cannot occupy all of them. Calls failing with an error that `is_retryable(exc)` accepts
+    are retried with jittered exponential backoff. After `failure_threshold` retryable failures
+    in a row the circuit opens: for `cooldown` seconds calls fail fast with CircuitOpenError,
+    then the next call is let through as a trial, other calls failing fast until it ends, and a
+    single further failure opens it again.
+    """
+
+    def __init__(self, name, max_concurrency, rate=0.0, burst=1, reserved=0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, failure_threshold=5, cooldown=30.0,
+                 is_retryable=lambda exc: False, on_retry=None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.reserved = min(reserved, max_concurrency - 1)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.is_retryable = is_retryable
+        # on_retry(exc, attempt, delay) is called before each retry, e.g. to count it.
+        self.on_retry = on_retry
+        self._bucket = TokenBucket(rate, burst)
+        self._waiters = []
+        self._order = itertools.count()
+        self._timer = None
+        self._active = 0
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial_active = False
+
+    async def call(self, func, *args):
+        """Runs `await func(*args)` at the current priority, retrying retryable errors."""
+        priority = current_priority()
+        attempt = 0
+        while True:
+            trial = self._check_circuit()
+            try:
+                result = await self._run(priority, func, args)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                self._record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                error = e
+            else:
+                self._failures = 0
+                return result
+            finally:
+                if trial:
+                    self._trial_active = False
+
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            attempt += 1
+            if self.on_retry is not None:
+                self.on_retry(error, attempt, delay)
+            await asyncio.sleep(delay)
+
+    @property
+    def state(self):
+        if self._failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self._open_until else "half_open"
+
+    def waiting(self):
+        """Number of queued calls per priority."""
+        counts = {priority: 0 for priority in Priority}
+        for priority, _, waiter in self._waiters:
+            if not waiter.done():
+                counts[priority] += 1
+        return counts
+
+    def _check_circuit(self):
+        """Raises CircuitOpenError unless a call may start; returns whether it is the half-open trial."""
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError(f"{self.name} is unavailable after repeated failures; retrying in "
+                                   f"{math.ceil(self._open_until - time.monotonic())}s.")
+        if state == "closed":
+            return False
+        if self._trial_active:
+            raise CircuitOpenError(f"{self.name} is unavailable after repeated failures; a trial call is in progress.")
+        self._trial_active = True
+        return True
+
+    async def _run(self, priority, func, args):
+        await self._acquire(priority)
+        try:
+            return await func(*args)
+        finally:
+            self._release()
+
+    def _record_failure(self):
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._open_until = time.monotonic() + self.cooldown
+
+    async def _acquire(self, priority):
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we were cancelled; hand it on.
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        # Grants slots to the queue head while capacity and rate allow.
+        while self._waiters:
+            priority, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            limit = self.max_concurrency if priority == Priority.INTERACTIVE else self.max_concurrency - self.reserved
+            if self._active >= limit:
+                return
+            delay = self._bucket.take()
+            if delay > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            self._active += 1
+            waiter.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
@@ -0,0 +1,107 @@
+"""
+Bulk cache warm-up: generates entries for a whole word list without the UI.
+
+    python warmup.py cet4.txt --batch-size 10 --concurrency 2 --requests-per-minute 30
+
+The word list has one word per line; blank lines and lines starting with # are ignored.
+Words already in the history are skipped and every generated entry is saved as soon as
+its batch finishes, so an interrupted run picks up where it stopped when started again.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import core
+from settings import DEFAULT_BASE_URL, settings
+from upstream import Priority, with_priority
+
+
+class RateLimiter:
+    """Spaces out request starts to at most `per_minute` per minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def read_word_list(path):
+    """Reads the cleaned, de-duplicated words of a word list file."""
+    words = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            word = core.clean_word(line)
+            if word and word not in seen:
+                seen.add(word)
+                words.append(word)
+    return words
+
+
+async def warm_up(words, args):
+    variant = core.cache_variant(settings.prompt_template, settings.system_prompt, args.base_url)
+    pending = [word for word in words if core.history.lookup(word, variant) == -1]
+    print(f"{len(words)} words, {len(words) - len(pending)} already cached, {len(pending)} to generate.")
+    if not pending:
+        return 0
+
+    batches = [pending[i:i + args.batch_size] for i in range(0, len(pending), args.batch_size)]
+    limiter = RateLimiter(args.requests_per_minute)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    progress = {"done": 0, "failed": 0}
+
+    async def run_batch(batch):
+        async with semaphore:
+            await limiter.wait()
+            try:
+                results = await with_priority(Priority.BULK, core.generate_batch(
+                    batch, args.api_key, args.base_url, settings.prompt_template, settings.system_prompt
+                ))
+            except Exception as e:
+                print(f"Batch {batch[0]}..{batch[-1]} failed: {e}")
+                results = {}
+            for word in batch:
+                if word in results:
+                    await core.store_entry(word, variant, *results[word])
+                    progress["done"] += 1
+                else:
+                    progress["failed"] += 1
+            print(f"[{progress['done'] + progress['failed']}/{len(pending)}] "
+                  f"{progress['done']} generated, {progress['failed']} failed")
+
+    await asyncio.gather(*(run_batch(batch) for batch in batches))
+    if progress["failed"]:
+        print("Some words failed; run the same command again to retry them.")
+    return 1 if progress["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate cache entries for a word list.")
+    parser.add_argument("word_list", help="Text file with one word per line.")
+    parser.add_argument("--batch-size", type=int, default=10, help="Words per completion request.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Completion requests in flight at once.")
+    parser.add_argument("--requests-per-minute", type=float, default=30, help="Upper bound on request starts per minute; 0 for no limit.")
+    parser.add_argument("--api-key", default=None, help="DeepSeek API key; defaults to DEEPSEEK_API_KEY or the saved .api_key.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="OpenAI-compatible API base URL.")
+    args = parser.parse_args(argv)
+
+    if not (args.api_key or settings.api_key):
+        parser.error("no API key: pass --api-key, set DEEPSEEK_API_KEY or save one in the UI first.")
+
+    return asyncio.run(warm_up(read_word_list(args.word_list), args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
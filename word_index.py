@@ -0,0 +1,190 @@
+"""
+Typeahead over the cached words: prefix completion and typo-tolerant matching.
+
+The trie is kept flat, as the sorted list of case-folded words: the words below a trie node
+are one contiguous slice of it, found with two bisects, so completion takes O(log n) and
+needs no per-node objects. Typos are matched with a deletion index (as in SymSpell): every
+word is filed under itself and each form with one letter deleted, so two words within one
+missing, extra, wrong or swapped letter share a key. The keys are stored as hashes in a
+sorted array of 64-bit integers, under 200 bytes per word, and each match is checked
+against the word itself.
+"""
+import bisect
+import heapq
+import threading
+from array import array
+
+# Additions wait in a dict until there are enough to merge into the sorted array.
+MIN_MERGE = 4096
+
+
+def fold(word):
+    """The key of a word: case-folded, reusing the word itself when it is already folded."""
+    key = word.casefold()
+    return word if key == word else key
+
+
+def deletions(key):
+    """The key itself and every form of it with one letter deleted."""
+    forms = {key}
+    for i in range(len(key)):
+        forms.add(key[:i] + key[i + 1:])
+    return forms
+
+
+def within_one_edit(a, b):
+    """Whether a and b differ by at most one inserted, deleted, replaced or swapped letter."""
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > 1:
+        return False
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] and a[i + 2:] == b[i + 2:])
+
+
+class WordIndex:
+    """
+    The distinct words of the history, for search(). Words are only ever added; matching
+    ignores case but returns the words as they were added.
+    """
+
+    def __init__(self, words=()):
+        self._keys = []
+        self._words = []
+        self._ids = {}
+        # Built by build_deletions(), so loading a large history stays fast.
+        self._deletions = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_count = 0
+        for word in words:
+            key = fold(word)
+            if key not in self._ids:
+                self._keys.append(key)
+                self._new_word(key, word)
+        self._keys.sort()
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word):
+        return fold(word) in self._ids
+
+    def add(self, word):
+        key = fold(word)
+        with self._lock:
+            if key in self._ids:
+                return
+            bisect.insort(self._keys, key)
+            word_id = self._new_word(key, word)
+            if self._deletions is None:
+                return
+            self._add_pending(word_id)
+            if self._pending_count >= max(MIN_MERGE, len(self._deletions) // 8):
+                self._merge()
+
+    def build_deletions(self):
+        """
+        Builds the deletion index similar() needs; until then similar() finds nothing. Takes
+        seconds for a large history, so it may run in another thread while words are added.
+        """
+        with self._lock:
+            if self._deletions is not None:
+                return
+            count = len(self._words)
+        built = self._build_deletions(count)
+        with self._lock:
+            # Words added while building.
+            for word_id in range(count, len(self._words)):
+                self._add_pending(word_id)
+            self._deletions = built
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` words starting with prefix, in alphabetical order."""
+        prefix = fold(prefix)
+        keys = self._keys
+        start = bisect.bisect_left(keys, prefix)
+        results = []
+        for key in keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            results.append(self._words[self._ids[key]])
+        return results
+
+    def similar(self, word, limit=10):
+        """
+        Up to `limit` words one missing, extra, wrong or swapped letter away from `word`, then,
+        for words of five or more letters, words two such edits away that share a form with one
+        letter deleted with it. The word itself is not included. Finds nothing until
+        build_deletions() has run.
+        """
+        key = fold(word)
+        deletions_ = self._deletions
+        if deletions_ is None:
+            return []
+        forms = deletions(key)
+        candidates = set()
+        for form in forms:
+            h = hash(form) & 0xFFFFFFFF
+            i = bisect.bisect_left(deletions_, h << 32)
+            while i < len(deletions_) and deletions_[i] >> 32 == h:
+                candidates.add(deletions_[i] & 0xFFFFFFFF)
+                i += 1
+            candidates.update(self._pending.get(h, ()))
+
+        matches = []
+        for word_id in candidates:
+            other = fold(self._words[word_id])
+            if other == key:
+                continue
+            if within_one_edit(key, other):
+                matches.append((1, other, self._words[word_id]))
+            # Also rules out hash collisions.
+            elif len(key) >= 5 and not forms.isdisjoint(deletions(other)):
+                matches.append((2, other, self._words[word_id]))
+        return [word for _, _, word in heapq.nsmallest(limit, matches)]
+
+    def search(self, text, limit=10):
+        """Typeahead results: the words starting with text, then words it may be a misspelling of."""
+        results = self.complete(text, limit)
+        if len(results) < limit:
+            results += [word for word in self.similar(text, limit) if word not in results][:limit - len(results)]
+        return results
+
+    def _new_word(self, key, word):
+        word_id = len(self._words)
+        self._ids[key] = word_id
+        self._words.append(word)
+        return word_id
+
+    def _add_pending(self, word_id):
+        for form in deletions(fold(self._words[word_id])):
+            self._pending.setdefault(hash(form) & 0xFFFFFFFF, []).append(word_id)
+            self._pending_count += 1
+
+    def _build_deletions(self, count):
+        # Sorted bucket by bucket (on the top byte of the hash) rather than in one go, so other
+        # threads, e.g. the event loop serving requests, are never held up for long.
+        buckets = [[] for _ in range(256)]
+        for word_id, word in enumerate(self._words[:count]):
+            for form in deletions(fold(word)):
+                h = hash(form) & 0xFFFFFFFF
+                buckets[h >> 24].append(h << 32 | word_id)
+        built = array("Q")
+        for bucket in buckets:
+            bucket.sort()
+            built.extend(bucket)
+            # Freed as we go too: freeing all the entries at once takes tens of milliseconds.
+            bucket.clear()
+        return built
+
+    def _merge(self):
+        added = sorted(h << 32 | word_id for h, word_ids in self._pending.items() for word_id in word_ids)
+        # Readers may briefly see an entry in both; similar() collects candidates in a set.
+        self._deletions = array("Q", heapq.merge(self._deletions, added))
+        self._pending = {}
+        self._pending_count = 0